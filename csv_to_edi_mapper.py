@@ -7,40 +7,155 @@ The CSV file should contain order header and line item sections marked with spec
 """
 
 import csv
-import xml.etree.ElementTree as ET
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+import functools
+import logging
+import operator
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple, Any
 import os
 import sys
+import uuid
+
+try:
+    from lxml import etree as ET
+    _USE_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    _USE_LXML = False
+
+logger = logging.getLogger(__name__)
+
+
+def _make_parser():
+    """
+    Create the parser used for base XML templates.
+    
+    With lxml, ignorable whitespace is dropped so later lookups walk a smaller
+    tree, and entities and network resources are never resolved. libxml2's
+    default depth and text size limits stay on, since templates are small.
+    Returns None (the default parser) for the stdlib fallback.
+    """
+    if _USE_LXML:
+        return ET.XMLParser(remove_blank_text=True, resolve_entities=False,
+                            no_network=True)
+    return None
+
+
+def _compile_path(path: str):
+    """
+    Compile an element path once into a callable returning the list of matches.
+    
+    Uses lxml's XPath class when available, otherwise defers to findall.
+    """
+    if _USE_LXML:
+        return ET.XPath(path)
+    return operator.methodcaller('findall', path)
 
 
 class CSVToEDIMapper:
-    """Main class for mapping CSV order data to TrueCommerce XML format."""
+    """
+    Main class for mapping CSV order data to TrueCommerce XML format.
+    
+    With lxml, map_line_items defers building the OrderLines so that
+    generate_output_xml can stream them to the output file one at a time.
+    Reading the tree or root attribute adds any deferred OrderLines to the
+    tree first, so callers always see the complete document.
+    """
+    
+    # Outputs directory in the project root, not relative to base XML location
+    _DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'outputs')
+    
+    # Template paths are relative to the root element and compiled once.
+    # Only the root element is namespaced, so the paths need no prefixes.
+    _DOCUMENT_PATH = _compile_path('Document')
+    
+    # Header mappings: (parent element path, [(child tag, CSV header field), ...]).
+    # Missing child elements are created under the parent.
+    _HEADER_MAP = [
+        (_compile_path('Document/OrderHeader'), [
+            ('CustOrder', 'CUST-ORDER'),
+            ('TotalOrderUnits', 'TOTAL-ORDER-UNITS'),
+            ('TotalOrderVal', 'TOTAL-ORDER-VALUE'),
+        ]),
+        (_compile_path('Document/DocHeader/CustAddr'), [
+            ('Code', 'CUST-ADDR-CODE'),
+            ('Name', 'CUST-ADDR-NAME'),
+            ('Address1', 'CUST-ADDR-ADDRESS1'),
+            ('Address2', 'CUST-ADDR-ADDRESS2'),
+            ('Address3', 'CUST-ADDR-ADDRESS3'),
+        ]),
+        (_compile_path('Document/OrderHeader/Delivery/ReqDel'), [
+            ('Date', 'DELIVERY-DUE-DATE'),
+        ]),
+        (_compile_path('Document/OrderHeader/Delivery/DeliverTo'), [
+            ('Code', 'DELIVERY-TO-CODE'),
+            ('Name', 'DELIVERY-TO-NAME'),
+            ('Address1', 'DELIVERY-TO-ADDRESS1'),
+        ]),
+        (_compile_path('Document/OrderHeader/Locations/InvoiceTo'), [
+            ('Code', 'INVOICE-TO-CODE'),
+            ('Name', 'INVOICE-TO-NAME'),
+            ('Address1', 'INVOICE-TO-ADDRESS1'),
+        ]),
+    ]
+    
+    # Column A section markers
+    _MARKERS = {
+        '###ORD-HEADER': 'header',
+        '###ORD-HEADER-END': 'header_end',
+        '###ORD-LINES': 'lines',
+        '###ORD-LINES-END': 'lines_end',
+    }
     
-    def __init__(self, base_xml_path: str):
+    # Line item mappings: (element path relative to OrderLine, CSV line field)
+    _LINE_MAP = [
+        (_compile_path('LineNo'), 'LINE-NO'),
+        (_compile_path('Item/CustItem/Code'), 'LINE-CODE'),
+        (_compile_path('Item/Desc1'), 'LINE-DESC'),
+        (_compile_path('OrderQty/Unit'), 'LINE-QUANT'),
+        (_compile_path('CostPrice'), 'LINE-PRICE'),
+        (_compile_path('LineAmount'), 'LINE-TOTAL-AMOUNT'),
+    ]
+    
+    def __init__(self, base_xml_path: str, template_bytes: Optional[bytes] = None):
         """
         Initialize the mapper with the base XML template.
         
         Args:
             base_xml_path: Path to the base XML template file
+            template_bytes: Contents of the base XML template, if already read;
+                otherwise the file is read on the first load_base_xml call
         """
         self.base_xml_path = base_xml_path
-        self.tree = None
-        self.root = None
+        self._template_bytes = template_bytes
+        self._tree = None
+        self._root = None
         self.header_data = {}
         self.line_items = []
         self.namespaces = {'tc': 'http://www.truecommerce.com/docs/order'}
+        # (DocTrailer, blueprint) for OrderLines still to be streamed out by lxml
+        self._pending_lines = None
+        # Output directories already created by this instance
+        self._created_dirs = set()
         
     def load_base_xml(self) -> bool:
         """
         Load the base XML template.
         
+        The template file is read once per instance and kept in memory, so each
+        call only parses a fresh tree from the cached bytes.
+        
         Returns:
             bool: True if successful, False otherwise
         """
         try:
-            self.tree = ET.parse(self.base_xml_path)
-            self.root = self.tree.getroot()
+            if self._template_bytes is None:
+                with open(self.base_xml_path, 'rb') as file:
+                    self._template_bytes = file.read()
+            
+            self._tree = ET.ElementTree(ET.fromstring(self._template_bytes, _make_parser()))
+            self._root = self._tree.getroot()
+            self._pending_lines = None
             return True
         except Exception as e:
             print(f"Error loading base XML: {e}")
@@ -60,113 +175,126 @@ class CSVToEDIMapper:
         Returns:
             bool: True if successful, False otherwise
         """
+        # Start clean so a reused mapper never carries over the previous order
+        self.header_data = {}
+        self.line_items = []
+        
         try:
-            with open(csv_path, 'r', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                rows = list(reader)
-                
-            return self._extract_sections(rows)
+            # newline='' is what csv.reader expects; the large buffer cuts read calls
+            with open(csv_path, 'r', encoding='utf-8', newline='', buffering=1 << 20) as file:
+                return self._extract_sections(csv.reader(file))
             
         except Exception as e:
             print(f"Error parsing CSV: {e}")
             return False
     
-    def _extract_sections(self, rows: List[List[str]]) -> bool:
+    def _extract_sections(self, rows: Iterable[List[str]]) -> bool:
         """
         Extract header and line items from CSV rows based on markers.
         
+        The rows are consumed in a single pass, so they can be streamed
+        straight from a csv.reader without being held in memory.
+        
         Args:
-            rows: List of CSV rows
+            rows: Iterable of CSV rows
             
         Returns:
             bool: True if successful, False otherwise
         """
-        current_section = None
-        header_start = None
-        header_end = None
-        lines_start = None
-        lines_end = None
+        # One of None, 'header_fields', 'header_values', 'line_headers', 'line_data'
+        section = None
+        field_names = []
+        header_data = {}
+        line_headers = []
+        line_items = []
         
-        # Find section boundaries
-        for i, row in enumerate(rows):
-            if not row or len(row) == 0:
-                continue
-                
-            marker = row[0].strip()
-            
-            if marker == "###ORD-HEADER":
-                current_section = "header"
-                header_start = i + 1
-            elif marker == "###ORD-HEADER-END":
-                header_end = i
-            elif marker == "###ORD-LINES":
-                current_section = "lines"
-                lines_start = i + 1
-            elif marker == "###ORD-LINES-END":
-                lines_end = i
-        
-        # Extract header data
-        if header_start is not None and header_end is not None:
-            self.header_data = self._extract_header_data(rows[header_start:header_end])
-        
-        # Extract line items
-        if lines_start is not None and lines_end is not None:
-            self.line_items = self._extract_line_items(rows[lines_start:lines_end])
+        for row in rows:
+            # Markers always contain '#'; other rows skip the strip and lookup
+            if row and '#' in row[0]:
+                marker = self._MARKERS.get(row[0].strip())
+            else:
+                marker = None
+            
+            if marker is not None:
+                if marker == "header":
+                    section = "header_fields"
+                    header_data = {}
+                elif marker == "header_end":
+                    section = None
+                    self.header_data = header_data
+                elif marker == "lines":
+                    section = "line_headers"
+                    line_items = []
+                else:
+                    section = None
+                    self.line_items = line_items
+            elif section == "line_data":
+                line_item = self._extract_line_item(line_headers, row)
+                if line_item is not None:
+                    line_items.append(line_item)
+            elif section == "header_fields":
+                # First row has field names, second row has values
+                field_names = self._extract_field_names(row)
+                section = "header_values"
+            elif section == "header_values":
+                header_data = self._extract_header_data(field_names, row)
+                section = None
+            elif section == "line_headers":
+                # Assume first row contains headers
+                line_headers = self._extract_field_names(row)
+                section = "line_data"
         
         return True
     
-    def _extract_header_data(self, header_rows: List[List[str]]) -> Dict[str, Any]:
+    def _extract_field_names(self, row: List[str]) -> List[str]:
         """
-        Extract header data from CSV rows.
-        The first row contains field names, the second row contains values.
+        Extract the non-empty field names from a section's first row.
         
         Args:
-            header_rows: Rows containing header data
+            row: CSV row containing field names
+            
+        Returns:
+            List of stripped field names
+        """
+        return [name for name in (col.strip() for col in row) if name]
+    
+    def _extract_header_data(self, field_names: List[str], field_values: List[str]) -> Dict[str, Any]:
+        """
+        Extract header data from the header values row.
+        
+        Args:
+            field_names: Header field names
+            field_values: Row containing the header values
             
         Returns:
             Dict containing header field mappings
         """
         header_data = {}
         
-        if len(header_rows) >= 2:
-            # First row has field names, second row has values
-            field_names = [col.strip() for col in header_rows[0] if col and col.strip()]
-            field_values = header_rows[1] if len(header_rows) > 1 else []
-            
-            for i, field_name in enumerate(field_names):
-                if i < len(field_values) and field_values[i] and field_values[i].strip():
-                    header_data[field_name] = field_values[i].strip()
+        for field_name, value in zip(field_names, field_values):
+            value = value.strip()
+            if value:
+                header_data[field_name] = value
         
         return header_data
     
-    def _extract_line_items(self, line_rows: List[List[str]]) -> List[Dict[str, Any]]:
+    def _extract_line_item(self, headers: List[str], row: List[str]) -> Optional[Dict[str, Any]]:
         """
-        Extract line item data from CSV rows.
+        Extract a single line item from a CSV row.
         
         Args:
-            line_rows: Rows containing line item data
+            headers: Line item field names
+            row: Row containing line item data
             
         Returns:
-            List of dictionaries containing line item data
+            Dictionary containing line item data, or None for a blank row
         """
-        line_items = []
-        
-        if not line_rows:
-            return line_items
+        # One join and scan instead of stripping every cell to spot blank rows
+        joined = ''.join(row)
+        if not joined or joined.isspace():
+            return None
         
-        # Assume first row contains headers
-        headers = [col.strip() for col in line_rows[0] if col.strip()]
-        
-        # Process data rows
-        for row in line_rows[1:]:
-            if len(row) > 0 and any(cell.strip() for cell in row):
-                line_item = {}
-                for i, header in enumerate(headers):
-                    if i < len(row):
-                        line_item[header] = row[i].strip()
-                line_items.append(line_item)
-        
-        return line_items
+        return {header: cell.strip() for header, cell in zip(headers, row)}
     
     def map_header_data(self) -> bool:
         """
@@ -176,49 +304,24 @@ class CSVToEDIMapper:
             bool: True if successful, False otherwise
         """
         try:
-            # Map CUST-ORDER to OrderHeader/CustOrder
-            if 'CUST-ORDER' in self.header_data:
-                elem = self.root.find('.//OrderHeader/CustOrder', self.namespaces)
-                if elem is not None:
-                    elem.text = self.header_data['CUST-ORDER']
-                    print(f"Updated CustOrder: {self.header_data['CUST-ORDER']}")
-            
-            # Map customer address fields to Document/DocHeader/CustAddr
-            cust_addr = self.root.find('.//Document/DocHeader/CustAddr', self.namespaces)
-            if cust_addr is not None:
-                self._update_or_create_element(cust_addr, 'Code', self.header_data.get('CUST-ADDR-CODE'))
-                self._update_or_create_element(cust_addr, 'Name', self.header_data.get('CUST-ADDR-NAME'))
-                self._update_or_create_element(cust_addr, 'Address1', self.header_data.get('CUST-ADDR-ADDRESS1'))
-                self._update_or_create_element(cust_addr, 'Address2', self.header_data.get('CUST-ADDR-ADDRESS2'))
-                self._update_or_create_element(cust_addr, 'Address3', self.header_data.get('CUST-ADDR-ADDRESS3'))
-            
-            # Map delivery due date to Document/OrderHeader/Delivery/ReqDel/Date (corrected path)
-            req_del = self.root.find('.//Document/OrderHeader/Delivery/ReqDel', self.namespaces)
-            if req_del is not None and 'DELIVERY-DUE-DATE' in self.header_data:
-                date_elem = req_del.find('Date')
-                if date_elem is not None:
-                    date_elem.text = self.header_data['DELIVERY-DUE-DATE']
-                    print(f"Updated Delivery Due Date: {self.header_data['DELIVERY-DUE-DATE']}")
-            
-            # Map delivery address fields to Document/OrderHeader/Delivery/DeliverTo (corrected path)
-            deliver_to = self.root.find('.//Document/OrderHeader/Delivery/DeliverTo', self.namespaces)
-            if deliver_to is not None:
-                self._update_or_create_element(deliver_to, 'Code', self.header_data.get('DELIVERY-TO-CODE'))
-                self._update_or_create_element(deliver_to, 'Name', self.header_data.get('DELIVERY-TO-NAME'))
-                self._update_or_create_element(deliver_to, 'Address1', self.header_data.get('DELIVERY-TO-ADDRESS1'))
-            
-            # Map invoice address fields to Document/OrderHeader/Locations/InvoiceTo (corrected path)
-            invoice_to = self.root.find('.//Document/OrderHeader/Locations/InvoiceTo', self.namespaces)
-            if invoice_to is not None:
-                self._update_or_create_element(invoice_to, 'Code', self.header_data.get('INVOICE-TO-CODE'))
-                self._update_or_create_element(invoice_to, 'Name', self.header_data.get('INVOICE-TO-NAME'))
-                self._update_or_create_element(invoice_to, 'Address1', self.header_data.get('INVOICE-TO-ADDRESS1'))
-            
-            # Map order totals to Document/OrderHeader (corrected path)
-            order_header = self.root.find('.//Document/OrderHeader', self.namespaces)
-            if order_header is not None:
-                self._update_or_create_element(order_header, 'TotalOrderUnits', self.header_data.get('TOTAL-ORDER-UNITS'))
-                self._update_or_create_element(order_header, 'TotalOrderVal', self.header_data.get('TOTAL-ORDER-VALUE'))
+            header_data = self.header_data
+            if not header_data:
+                return True
+            
+            for parent_path, fields in self._HEADER_MAP:
+                # Only look up the parent when the CSV supplies one of its fields
+                values = [(tag_name, header_data[field_name])
+                          for tag_name, field_name in fields if field_name in header_data]
+                if not values:
+                    continue
+                
+                matches = parent_path(self._root)
+                if not matches:
+                    continue
+                parent = matches[0]
+                
+                for tag_name, value in values:
+                    self._update_or_create_element(parent, tag_name, value)
             
             return True
             
@@ -226,53 +329,78 @@ class CSVToEDIMapper:
             print(f"Error mapping header data: {e}")
             return False
     
-    def _create_order_line_from_template(self, template, line_item):
+    def _build_line_blueprint(self, template) -> List[tuple]:
         """
-        Create a new OrderLine element from template with CSV line item data.
+        Flatten the OrderLine template into the list each new line is built from.
+        
+        Each entry is (parent index, tag, attrib, text, tail, CSV field). Entry 0 is
+        the OrderLine itself and every other entry refers back to its parent's
+        position in the list. The elements selected by _LINE_MAP are resolved on
+        the template here, once, and their CSV field is recorded on the entry.
         
         Args:
-            template: Base OrderLine element to copy
-            line_item: Dictionary containing line item data
+            template: Base OrderLine element
             
         Returns:
-            New OrderLine element with mapped data
+            List of blueprint entries in document order per parent
         """
-        import copy
-        
-        # Create deep copy of template
-        new_line = copy.deepcopy(template)
-        
-        # Map LINE-NO to OrderLine/LineNo
-        line_no_elem = new_line.find('LineNo')
-        if line_no_elem is not None and 'LINE-NO' in line_item:
-            line_no_elem.text = line_item['LINE-NO']
-        
-        # Map LINE-CODE to OrderLine/Item/CustItem/Code
-        cust_item_code = new_line.find('.//Item/CustItem/Code')
-        if cust_item_code is not None and 'LINE-CODE' in line_item:
-            cust_item_code.text = line_item['LINE-CODE']
-        
-        # Map LINE-DESC to OrderLine/Item/Desc1
-        desc1_elem = new_line.find('.//Item/Desc1')
-        if desc1_elem is not None and 'LINE-DESC' in line_item:
-            desc1_elem.text = line_item['LINE-DESC']
-        
-        # Map LINE-QUANT to OrderLine/OrderQty/Unit
-        order_qty_unit = new_line.find('.//OrderQty/Unit')
-        if order_qty_unit is not None and 'LINE-QUANT' in line_item:
-            order_qty_unit.text = line_item['LINE-QUANT']
-        
-        # Map LINE-PRICE to OrderLine/CostPrice
-        cost_price_elem = new_line.find('CostPrice')
-        if cost_price_elem is not None and 'LINE-PRICE' in line_item:
-            cost_price_elem.text = line_item['LINE-PRICE']
+        mapped_fields = {}
+        for path, field_name in self._LINE_MAP:
+            matches = path(template)
+            if matches:
+                mapped_fields[matches[0]] = field_name
+        
+        blueprint = [(-1, template.tag, dict(template.attrib), template.text,
+                      template.tail, mapped_fields.get(template))]
+        pending = [(template, 0)]
+        while pending:
+            elem, index = pending.pop()
+            for child in elem:
+                # Skip comments and processing instructions kept by lxml
+                if not isinstance(child.tag, str):
+                    continue
+                blueprint.append((index, child.tag, dict(child.attrib), child.text,
+                                  child.tail, mapped_fields.get(child)))
+                pending.append((child, len(blueprint) - 1))
+        
+        return blueprint
+    
+    def _create_order_line_from_template(self, parent, blueprint, line_item):
+        """
+        Create a new OrderLine element from the template blueprint with CSV line item data.
         
-        # Map LINE-TOTAL-AMOUNT to OrderLine/LineAmount
-        line_amount_elem = new_line.find('LineAmount')
-        if line_amount_elem is not None and 'LINE-TOTAL-AMOUNT' in line_item:
-            line_amount_elem.text = line_item['LINE-TOTAL-AMOUNT']
+        The copy is built with parent.makeelement/SubElement so that, under lxml,
+        it belongs to the output document from the start and inserting it does
+        not have to merge it in from a separate document.
         
-        return new_line
+        Args:
+            parent: Element the new OrderLine will be inserted into
+            blueprint: Flattened template from _build_line_blueprint
+            line_item: Dictionary containing line item data
+            
+        Returns:
+            New OrderLine element with mapped data
+        """
+        # Bound once per line instead of looked up for every element
+        sub_element = ET.SubElement
+        elements = []
+        add_element = elements.append
+        
+        for parent_index, tag, attrib, text, tail, field_name in blueprint:
+            if parent_index < 0:
+                elem = parent.makeelement(tag, attrib)
+            else:
+                elem = sub_element(elements[parent_index], tag, attrib)
+            
+            if field_name is not None:
+                text = line_item.get(field_name, text)
+            if text is not None:
+                elem.text = text
+            if tail is not None:
+                elem.tail = tail
+            add_element(elem)
+        
+        return elements[0]
     
     def _update_or_create_element(self, parent, tag_name: str, value: str):
         """
@@ -289,18 +417,22 @@ class CSVToEDIMapper:
         elem = parent.find(tag_name)
         if elem is not None:
             elem.text = value
-            print(f"Updated {tag_name}: {value}")
+            logger.debug("Updated %s: %s", tag_name, value)
         else:
             # Create new element
             new_elem = ET.SubElement(parent, tag_name)
             new_elem.text = value
-            print(f"Created {tag_name}: {value}")
+            logger.debug("Created %s: %s", tag_name, value)
     
     def map_line_items(self) -> bool:
         """
         Map line item data from CSV to XML structure.
         Creates multiple OrderLine elements based on CSV line items.
         
+        With lxml the OrderLines are not built here; generate_output_xml
+        streams them to the output file, or they are added to the tree the
+        first time the tree or root attribute is read.
+        
         Returns:
             bool: True if successful, False otherwise
         """
@@ -310,10 +442,11 @@ class CSVToEDIMapper:
                 return True
             
             # Find the Document element and existing OrderLine
-            document = self.root.find('.//Document', self.namespaces)
-            if document is None:
+            matches = self._DOCUMENT_PATH(self._root)
+            if not matches:
                 print("Document element not found")
                 return False
+            document = matches[0]
             
             # Find the base OrderLine to use as template
             base_order_line = document.find('OrderLine')
@@ -321,30 +454,29 @@ class CSVToEDIMapper:
                 print("Base OrderLine not found")
                 return False
             
+            # New lines go before DocTrailer
+            doc_trailer = document.find('DocTrailer')
+            if doc_trailer is None:
+                print("DocTrailer not found")
+                return False
+            
             # Remove existing OrderLine first
             document.remove(base_order_line)
             
-            # Create new OrderLine elements for each CSV line item
-            for i, line_item in enumerate(self.line_items):
-                # Create a copy of the base OrderLine
-                new_order_line = self._create_order_line_from_template(base_order_line, line_item)
-                
-                # Insert before DocTrailer
-                doc_trailer = document.find('DocTrailer')
-                if doc_trailer is not None:
-                    document.insert(list(document).index(doc_trailer), new_order_line)
-                else:
-                    document.append(new_order_line)
-                
-                print(f"Created OrderLine {i+1}: {line_item.get('LINE-CODE', 'Unknown')}")
+            blueprint = self._build_line_blueprint(base_order_line)
+            
+            if _USE_LXML:
+                # generate_output_xml builds and writes the lines one at a time
+                # ahead of DocTrailer, so they are never all held in the tree
+                self._pending_lines = (doc_trailer, blueprint)
+            else:
+                self._insert_order_lines(document, doc_trailer, blueprint)
             
             # Update DocTrailer/TotalLines
-            doc_trailer = document.find('DocTrailer')
-            if doc_trailer is not None:
-                total_lines_elem = doc_trailer.find('TotalLines')
-                if total_lines_elem is not None:
-                    total_lines_elem.text = str(len(self.line_items))
-                    print(f"Updated TotalLines: {len(self.line_items)}")
+            total_lines_elem = doc_trailer.find('TotalLines')
+            if total_lines_elem is not None:
+                total_lines_elem.text = str(len(self.line_items))
+                logger.debug("Updated TotalLines: %d", len(self.line_items))
             
             return True
             
@@ -352,6 +484,61 @@ class CSVToEDIMapper:
             print(f"Error mapping line items: {e}")
             return False
     
+    def _insert_order_lines(self, document, doc_trailer, blueprint):
+        """
+        Create an OrderLine for each CSV line item and insert them before DocTrailer.
+        
+        Args:
+            document: Document element holding the OrderLines
+            doc_trailer: DocTrailer element the lines go in front of
+            blueprint: Flattened template from _build_line_blueprint
+        """
+        if not _USE_LXML:
+            insert_index = list(document).index(doc_trailer)
+        
+        # Create new OrderLine elements for each CSV line item
+        for i, line_item in enumerate(self.line_items):
+            # Create a copy of the base OrderLine
+            new_order_line = self._create_order_line_from_template(document, blueprint, line_item)
+            if _USE_LXML:
+                # lxml's insert() walks the child list; addprevious does not
+                doc_trailer.addprevious(new_order_line)
+            else:
+                document.insert(insert_index + i, new_order_line)
+            
+            logger.debug("Created OrderLine %d: %s", i + 1, line_item.get('LINE-CODE', 'Unknown'))
+    
+    def _insert_pending_lines(self):
+        """Add OrderLines deferred by map_line_items to the tree."""
+        if self._pending_lines is not None:
+            doc_trailer, blueprint = self._pending_lines
+            self._pending_lines = None
+            self._insert_order_lines(doc_trailer.getparent(), doc_trailer, blueprint)
+    
+    @property
+    def tree(self):
+        """The XML tree being mapped, including any deferred OrderLines."""
+        self._insert_pending_lines()
+        return self._tree
+    
+    @tree.setter
+    def tree(self, tree):
+        self._tree = tree
+        self._root = None if tree is None else tree.getroot()
+        self._pending_lines = None
+    
+    @property
+    def root(self):
+        """Root element of the XML tree, including any deferred OrderLines."""
+        self._insert_pending_lines()
+        return self._root
+    
+    @root.setter
+    def root(self, root):
+        self._root = root
+        self._tree = None if root is None else ET.ElementTree(root)
+        self._pending_lines = None
+    
     def generate_output_xml(self, output_dir: str = None) -> str:
         """
         Generate the output XML file with the correct naming convention.
@@ -368,17 +555,26 @@ class CSVToEDIMapper:
             filename = f"WAITROSE_{cust_order}.XML"
             
             if output_dir is None:
-                # Create outputs directory in the project root, not relative to base XML location
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                output_dir = os.path.join(current_dir, 'outputs')
+                output_dir = self._DEFAULT_OUTPUT_DIR
             
-            # Create output directory if it doesn't exist
-            os.makedirs(output_dir, exist_ok=True)
+            # Create output directory if it doesn't exist, once per instance
+            if output_dir not in self._created_dirs:
+                os.makedirs(output_dir, exist_ok=True)
+                self._created_dirs.add(output_dir)
             
             output_path = os.path.join(output_dir, filename)
             
-            # Write the modified XML
-            self.tree.write(output_path, encoding='utf-8', xml_declaration=True)
+            # Write to a private temporary file and move it into place, so
+            # concurrent writers of the same order (e.g. batch workers) never
+            # interleave; whichever finishes last replaces the file whole
+            tmp_path = f"{output_path}.{os.getpid()}.tmp"
+            try:
+                self._write_xml(tmp_path)
+                os.replace(tmp_path, output_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
             
             print(f"Generated output XML: {output_path}")
             return output_path
@@ -387,6 +583,71 @@ class CSVToEDIMapper:
             print(f"Error generating output XML: {e}")
             return ""
     
+    def _write_xml(self, path: str):
+        """
+        Write the mapped document to a file.
+        
+        Args:
+            path: Path of the file to write
+        """
+        if self._pending_lines is not None:
+            doc_trailer, blueprint = self._pending_lines
+            document = doc_trailer.getparent()
+            
+            # Serialize the document around a placeholder where the OrderLines
+            # belong, so everything else comes out exactly as tree.write would
+            placeholder = ET.Comment(uuid.uuid4().hex)
+            doc_trailer.addprevious(placeholder)
+            try:
+                head, tail = ET.tostring(self._tree, encoding='UTF-8', xml_declaration=True).split(
+                    ET.tostring(placeholder, encoding='utf-8'), 1)
+            finally:
+                document.remove(placeholder)
+            
+            # Build and write the OrderLines one at a time in its place, each
+            # released once it has been written
+            with open(path, 'wb') as file:
+                file.write(head)
+                for i, line_item in enumerate(self.line_items):
+                    order_line = self._create_order_line_from_template(document, blueprint, line_item)
+                    file.write(ET.tostring(order_line, encoding='utf-8'))
+                    logger.debug("Created OrderLine %d: %s", i + 1, line_item.get('LINE-CODE', 'Unknown'))
+                file.write(tail)
+        elif _USE_LXML:
+            self._tree.write(path, encoding='utf-8', xml_declaration=True, pretty_print=False)
+        else:
+            self._tree.write(path, encoding='utf-8', xml_declaration=True)
+    
+    @classmethod
+    def batch(cls, base_xml_path: str, csv_paths: List[str], output_dir: str = None,
+              workers: Optional[int] = None) -> List[Tuple[str, bool]]:
+        """
+        Convert many CSV files in parallel worker processes.
+        
+        The base XML template is read once here and handed to each worker at
+        startup, so workers parse it from memory rather than from disk. CSV
+        files with the same CUST-ORDER share an output file; each is written
+        whole and the last one to finish replaces the others.
+        
+        Args:
+            base_xml_path: Path to the base XML template file
+            csv_paths: Paths to the input CSV files
+            output_dir: Directory to save the output files
+            workers: Number of worker processes (default: CPU count)
+            
+        Returns:
+            List of (csv_path, success) pairs in the order of csv_paths, one
+            per path even when a path is repeated
+        """
+        with open(base_xml_path, 'rb') as file:
+            template_bytes = file.read()
+        
+        process_file = functools.partial(_process_batch_file, base_xml_path, output_dir=output_dir)
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 initializer=_init_batch_worker,
+                                 initargs=(template_bytes,)) as executor:
+            return list(zip(csv_paths, executor.map(process_file, csv_paths)))
+    
     def process(self, csv_path: str, output_dir: str = None) -> bool:
         """
         Main processing method to convert CSV to EDI XML.
@@ -428,6 +689,22 @@ class CSVToEDIMapper:
             return False
 
 
+# Base XML template contents, set in each batch worker process by _init_batch_worker
+_worker_template_bytes = None
+
+
+def _init_batch_worker(template_bytes: bytes):
+    """Store the base XML template for CSVToEDIMapper.batch worker processes."""
+    global _worker_template_bytes
+    _worker_template_bytes = template_bytes
+
+
+def _process_batch_file(base_xml_path: str, csv_path: str, output_dir: str = None) -> bool:
+    """Convert one CSV file inside a CSVToEDIMapper.batch worker process."""
+    mapper = CSVToEDIMapper(base_xml_path, template_bytes=_worker_template_bytes)
+    return mapper.process(csv_path, output_dir)
+
+
 def main():
     """Main entry point for the script."""
     # Use default files from inputs folder
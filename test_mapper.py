@@ -6,7 +6,13 @@ This script tests the mapper with the actual order.csv and baseEDI.XML files.
 """
 
 import os
-from csv_to_edi_mapper import CSVToEDIMapper
+import shutil
+from csv_to_edi_mapper import CSVToEDIMapper, ET
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_FILE = os.path.join(BASE_DIR, "inputs", "order.csv")
+BASE_XML_FILE = os.path.join(BASE_DIR, "inputs", "baseEDI.XML")
 
 
 def test_mapper():
@@ -55,5 +61,75 @@ def test_mapper():
         print("\n❌ TEST FAILED!")
 
 
+def _mapped(csv_file=CSV_FILE):
+    """A mapper that has mapped csv_file but not yet written it."""
+    mapper = CSVToEDIMapper(BASE_XML_FILE)
+    assert mapper.load_base_xml()
+    assert mapper.parse_csv(csv_file)
+    assert mapper.map_header_data()
+    assert mapper.map_line_items()
+    return mapper
+
+
+def test_streamed_output_matches_tree_write(tmp_path):
+    # Reading root adds the deferred OrderLines, so the second mapper is
+    # written with tree.write rather than streamed
+    streamed = _mapped()
+    materialised = _mapped()
+    materialised.root
+    
+    streamed_path = streamed.generate_output_xml(str(tmp_path / "streamed"))
+    written_path = materialised.generate_output_xml(str(tmp_path / "written"))
+    
+    with open(streamed_path, 'rb') as streamed_file, open(written_path, 'rb') as written_file:
+        assert streamed_file.read() == written_file.read()
+
+
+def test_root_can_be_replaced():
+    mapper = _mapped()
+    root = mapper.root
+    
+    mapper.root = root
+    
+    assert mapper.root is root
+    assert mapper.tree.getroot() is root
+
+
+def test_output_replaced_without_leaving_temp_files(tmp_path):
+    mapper = _mapped()
+    
+    first_path = mapper.generate_output_xml(str(tmp_path))
+    second_path = mapper.generate_output_xml(str(tmp_path))
+    
+    assert first_path == second_path
+    assert os.listdir(tmp_path) == [os.path.basename(first_path)]
+    assert ET.parse(second_path).getroot().tag.endswith('TrueCommerceOrder')
+
+
+def test_template_bytes_reused(tmp_path):
+    base_xml_file = tmp_path / "baseEDI.XML"
+    shutil.copyfile(BASE_XML_FILE, base_xml_file)
+    mapper = CSVToEDIMapper(str(base_xml_file))
+    assert mapper.load_base_xml()
+    
+    # Later loads parse the bytes read by the first one
+    base_xml_file.unlink()
+    assert mapper.load_base_xml()
+    
+    with open(BASE_XML_FILE, 'rb') as file:
+        preloaded = CSVToEDIMapper(str(base_xml_file), template_bytes=file.read())
+    assert preloaded.load_base_xml()
+
+
+def test_batch_keeps_repeated_paths(tmp_path):
+    missing_csv = str(tmp_path / "missing.csv")
+    csv_paths = [CSV_FILE, missing_csv, CSV_FILE]
+    
+    results = CSVToEDIMapper.batch(BASE_XML_FILE, csv_paths, output_dir=str(tmp_path / "out"), workers=2)
+    
+    assert results == [(CSV_FILE, True), (missing_csv, False), (CSV_FILE, True)]
+    assert os.listdir(tmp_path / "out") == ["WAITROSE_CUST-001.XML"]
+
+
 if __name__ == "__main__":
     test_mapper()
\ No newline at end of file
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Tests for the CSV format validator.
+
+Each test writes a small CSV in the layout of inputs/order.csv and checks the
+(is_valid, errors) result of validate_csv_format.
+"""
+
+import os
+import time
+
+import pytest
+
+from validate_csv import (
+    MARKERS, E_READ_FAILED, E_EMPTY_FILE, E_MISSING_MARKERS, E_HEADER_ORDER, E_EMPTY_HEADER,
+    E_CUST_ORDER_MISSING, E_LINES_ORDER, E_EMPTY_LINES, format_error, main, validate_csv_format,
+    validate_many, _validate_cached,
+)
+
+
+HEADER_START_ROW = "###ORD-HEADER,,"
+HEADER_END_ROW = "###ORD-HEADER-END,,"
+LINES_START_ROW = "###ORD-LINES,,"
+LINES_END_ROW = "###ORD-LINES-END,,"
+
+VALID_ROWS = [
+    HEADER_START_ROW,
+    "CUST-ORDER,CUST-ADDR-CODE,TOTAL-ORDER-UNITS",
+    "CUST-001,CA0,530",
+    HEADER_END_ROW,
+    ",,",
+    LINES_START_ROW,
+    "LINE-NO,LINE-CODE,LINE-QUANT",
+    "1,32815,500",
+    "2,32816,30",
+    LINES_END_ROW,
+]
+
+
+def _csv(rows, newline="\n"):
+    """Join rows into CSV file contents, with a trailing newline."""
+    return (newline.join(rows) + newline).encode('utf-8')
+
+
+def _validate(tmp_path, content):
+    """Write content to a CSV file and validate it."""
+    csv_path = tmp_path / "order.csv"
+    csv_path.write_bytes(content)
+    return validate_csv_format(str(csv_path))
+
+
+def _codes(errors):
+    """Error codes of a validation result's errors."""
+    return [error[0] for error in errors]
+
+
+def _run_cli(monkeypatch, *csv_paths):
+    """Run the validator's main() and return its exit status."""
+    monkeypatch.setattr("sys.argv", ["validate_csv.py", *map(str, csv_paths)])
+    try:
+        main()
+    except SystemExit as e:
+        return e.code
+    return 0
+
+
+def test_valid(tmp_path):
+    assert _validate(tmp_path, _csv(VALID_ROWS)) == (True, [])
+
+
+def test_crlf_line_endings(tmp_path):
+    assert _validate(tmp_path, _csv(VALID_ROWS, "\r\n")) == (True, [])
+
+
+def test_bare_cr_line_endings(tmp_path):
+    assert _validate(tmp_path, _csv(VALID_ROWS, "\r")) == (True, [])
+
+
+def test_no_trailing_newline(tmp_path):
+    assert _validate(tmp_path, _csv(VALID_ROWS).rstrip(b"\n")) == (True, [])
+
+
+@pytest.mark.parametrize("marker", MARKERS)
+def test_missing_marker(tmp_path, marker):
+    rows = [row for row in VALID_ROWS if row.split(",")[0].encode() != marker]
+    
+    assert _validate(tmp_path, _csv(rows)) == (False, [(E_MISSING_MARKERS, (marker,))])
+
+
+def test_missing_all_markers(tmp_path):
+    is_valid, errors = _validate(tmp_path, b"CUST-ORDER,CUST-ADDR-CODE\nCUST-001,CA0\n")
+    
+    assert not is_valid
+    assert errors == [(E_MISSING_MARKERS, MARKERS)]
+
+
+def test_reversed_header_markers(tmp_path):
+    rows = [HEADER_END_ROW] + VALID_ROWS[1:3] + [HEADER_START_ROW] + VALID_ROWS[4:]
+    
+    assert _codes(_validate(tmp_path, _csv(rows))[1]) == [E_HEADER_ORDER]
+
+
+def test_reversed_lines_markers(tmp_path):
+    rows = VALID_ROWS[:5] + [LINES_END_ROW] + VALID_ROWS[6:9] + [LINES_START_ROW]
+    
+    assert _codes(_validate(tmp_path, _csv(rows))[1]) == [E_LINES_ORDER]
+
+
+def test_stray_end_marker_before_section(tmp_path):
+    # The later, correctly placed marker wins, as it does in the mapper
+    rows = VALID_ROWS[:5] + [LINES_END_ROW] + VALID_ROWS[5:]
+    
+    assert _validate(tmp_path, _csv(rows)) == (True, [])
+
+
+def test_markers_with_whitespace_and_quotes(tmp_path):
+    rows = list(VALID_ROWS)
+    rows[0] = '"###ORD-HEADER",,'
+    rows[3] = "  ###ORD-HEADER-END  ,,"
+    rows[5] = '" ###ORD-LINES ",,'
+    
+    assert _validate(tmp_path, _csv(rows)) == (True, [])
+
+
+def test_many_mid_line_marker_strings(tmp_path):
+    # Every line row mentions a marker; each must cost only its own line
+    rows = (VALID_ROWS[:7]
+            + [f"{i},Gift box ###ORD-LINES edition {i},1" for i in range(200000)]
+            + VALID_ROWS[9:])
+    content = _csv(rows)
+    
+    started = time.perf_counter()
+    result = _validate(tmp_path, content)
+    elapsed = time.perf_counter() - started
+    
+    assert result == (True, [])
+    assert elapsed < 5
+
+
+def test_marker_with_suffix_is_not_a_marker(tmp_path):
+    rows = ["###ORD-HEADERS,,"] + VALID_ROWS[1:]
+    
+    assert _validate(tmp_path, _csv(rows)) == (False, [(E_MISSING_MARKERS, (MARKERS[0],))])
+
+
+def test_empty_header(tmp_path):
+    rows = VALID_ROWS[:1] + VALID_ROWS[3:]
+    
+    assert _codes(_validate(tmp_path, _csv(rows))[1]) == [E_EMPTY_HEADER]
+
+
+def test_missing_cust_order(tmp_path):
+    rows = list(VALID_ROWS)
+    rows[1] = "CUST-ADDR-CODE,TOTAL-ORDER-UNITS"
+    
+    assert _codes(_validate(tmp_path, _csv(rows))[1]) == [E_CUST_ORDER_MISSING]
+
+
+def test_quoted_cust_order(tmp_path):
+    rows = list(VALID_ROWS)
+    rows[1] = '"CUST-ORDER","CUST-ADDR-CODE, ALT","TOTAL-ORDER-UNITS"'
+    
+    assert _validate(tmp_path, _csv(rows)) == (True, [])
+
+
+def test_empty_lines(tmp_path):
+    rows = VALID_ROWS[:6] + VALID_ROWS[9:]
+    
+    assert _codes(_validate(tmp_path, _csv(rows))[1]) == [E_EMPTY_LINES]
+
+
+def test_comma_only_lines(tmp_path):
+    rows = VALID_ROWS[:6] + [",,", "", " , ,\t"] + VALID_ROWS[9:]
+    
+    assert _codes(_validate(tmp_path, _csv(rows))[1]) == [E_EMPTY_LINES]
+
+
+def test_empty_file(tmp_path):
+    assert _validate(tmp_path, b"") == (False, [(E_EMPTY_FILE,)])
+
+
+def test_invalid_utf8_outside_header(tmp_path):
+    # The mapper decodes the whole file, so a bad byte in a line row fails too
+    content = _csv(VALID_ROWS).replace(b"32816", b"caf\xe9")
+    
+    assert _codes(_validate(tmp_path, content)[1]) == [E_READ_FAILED]
+
+
+def test_changed_file_is_revalidated(tmp_path):
+    assert _validate(tmp_path, _csv(VALID_ROWS)) == (True, [])
+    
+    rows = VALID_ROWS[:6] + VALID_ROWS[9:]
+    assert _codes(_validate(tmp_path, _csv(rows))[1]) == [E_EMPTY_LINES]
+
+
+def test_fail_fast_stops_at_first_error(tmp_path):
+    rows = VALID_ROWS[:1] + VALID_ROWS[3:6] + VALID_ROWS[9:]
+    content = _csv(rows)
+    
+    assert _codes(_validate(tmp_path, content)[1]) == [E_EMPTY_HEADER, E_EMPTY_LINES]
+    
+    csv_path = tmp_path / "order.csv"
+    assert validate_csv_format(str(csv_path), fail_fast=True) == (False, [(E_EMPTY_HEADER,)])
+
+
+@pytest.mark.parametrize("error, message", [
+    ((E_READ_FAILED, "bad byte"), "Failed to read CSV file: bad byte"),
+    ((E_EMPTY_FILE,), "CSV file is empty"),
+    ((E_MISSING_MARKERS, MARKERS[:2]), "Missing required markers: ###ORD-HEADER, ###ORD-HEADER-END"),
+    ((E_EMPTY_LINES,), "Lines section is empty"),
+])
+def test_format_error(error, message):
+    assert format_error(error) == message
+
+
+def test_unchanged_file_is_cached(tmp_path):
+    _validate_cached.cache_clear()
+    
+    assert _validate(tmp_path, _csv(VALID_ROWS)) == (True, [])
+    assert validate_csv_format(str(tmp_path / "order.csv")) == (True, [])
+    
+    assert _validate_cached.cache_info().hits == 1
+
+
+def test_read_failures_are_not_cached(tmp_path):
+    _validate_cached.cache_clear()
+    content = _csv(VALID_ROWS).replace(b"32816", b"caf\xe9")
+    
+    assert _codes(_validate(tmp_path, content)[1]) == [E_READ_FAILED]
+    assert _codes(validate_csv_format(str(tmp_path / "order.csv"))[1]) == [E_READ_FAILED]
+    
+    assert _validate_cached.cache_info().currsize == 0
+
+
+def test_file_descriptor_input(tmp_path):
+    csv_path = tmp_path / "order.csv"
+    csv_path.write_bytes(_csv(VALID_ROWS))
+    
+    fd = os.open(csv_path, os.O_RDONLY)
+    try:
+        assert validate_csv_format(fd) == (True, [])
+        # The caller's descriptor is left open
+        os.fstat(fd)
+    finally:
+        os.close(fd)
+
+
+def test_pipe_input():
+    read_fd, write_fd = os.pipe()
+    try:
+        os.write(write_fd, _csv(VALID_ROWS))
+        os.close(write_fd)
+        
+        assert validate_csv_format(read_fd) == (True, [])
+    finally:
+        os.close(read_fd)
+
+
+def test_cli_rejects_directory(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr("sys.argv", ["validate_csv.py", str(tmp_path)])
+    
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    
+    assert exit_info.value.code == 1
+    assert capsys.readouterr().out == f"Error: Cannot open file: {tmp_path} (Is a directory)\n"
+
+
+def test_validate_many_keeps_order_and_repeats(tmp_path):
+    valid_path = tmp_path / "valid.csv"
+    valid_path.write_bytes(_csv(VALID_ROWS))
+    empty_path = tmp_path / "empty.csv"
+    empty_path.write_bytes(b"")
+    csv_paths = [str(valid_path), str(empty_path), str(valid_path)]
+    
+    assert validate_many(csv_paths, workers=2) == [
+        (str(valid_path), (True, [])),
+        (str(empty_path), (False, [(E_EMPTY_FILE,)])),
+        (str(valid_path), (True, [])),
+    ]
+
+
+def test_cli_single_file_exit_status(tmp_path, monkeypatch):
+    valid_path = tmp_path / "valid.csv"
+    valid_path.write_bytes(_csv(VALID_ROWS))
+    empty_path = tmp_path / "empty.csv"
+    empty_path.write_bytes(b"")
+    
+    assert _run_cli(monkeypatch, valid_path) == 0
+    assert _run_cli(monkeypatch, empty_path) == 1
+    assert _run_cli(monkeypatch, tmp_path / "missing.csv") == 1
+
+
+def test_cli_multiple_files_exit_status(tmp_path, monkeypatch, capsys):
+    valid_path = tmp_path / "valid.csv"
+    valid_path.write_bytes(_csv(VALID_ROWS))
+    empty_path = tmp_path / "empty.csv"
+    empty_path.write_bytes(b"")
+    missing_path = tmp_path / "missing.csv"
+    
+    assert _run_cli(monkeypatch, valid_path, valid_path) == 0
+    assert _run_cli(monkeypatch, valid_path, empty_path) == 1
+    
+    capsys.readouterr()
+    assert _run_cli(monkeypatch, valid_path, missing_path) == 1
+    out = capsys.readouterr().out
+    assert f"Validating CSV file: {missing_path}" in out
+    assert "No such file or directory" in out
+
+
+def test_cli_report(tmp_path, monkeypatch, capsys):
+    csv_path = tmp_path / "order.csv"
+    csv_path.write_bytes(_csv(VALID_ROWS[:6] + VALID_ROWS[9:]))
+    
+    assert _run_cli(monkeypatch, csv_path) == 1
+    
+    out = capsys.readouterr().out
+    assert f"Validating CSV file: {csv_path}" in out
+    assert "❌ CSV file format is INVALID" in out
+    assert "  1. Lines section is empty" in out
@@ -5,122 +5,341 @@ CSV Format Validator
 Validates that CSV files follow the expected format for the EDI mapper.
 """
 
+import codecs
 import csv
+import errno
+import functools
+import io
+import mmap
+import re
+import stat
 import sys
 import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 
 
-def validate_csv_format(csv_path):
+# Column A section markers, in the order they appear in a valid file
+MARKERS = (b"###ORD-HEADER", b"###ORD-HEADER-END", b"###ORD-LINES", b"###ORD-LINES-END")
+HEADER_START, HEADER_END, LINES_START, LINES_END = range(len(MARKERS))
+
+_MARKER_PREFIX = b"###ORD-"
+# Any byte that makes a row more than blank cells
+_CONTENT_RE = re.compile(rb'[^\r\n,\t ]')
+# Matched from the start of a line. As in the mapper, a marker is column A
+# once csv.reader has unquoted it and it is stripped of whitespace. Group 1
+# is the opening quote; the pattern is generated from MARKERS with one group
+# per marker after it, in slot order, so match.lastindex - 2 is the slot.
+_MARKER_RE = re.compile(
+    rb'(")?[ \t\f\v]*' + re.escape(_MARKER_PREFIX)
+    + b"(?:" + b"|".join(b"(" + re.escape(marker[len(_MARKER_PREFIX):]) + b")" for marker in MARKERS) + b")"
+    + rb'[ \t\f\v]*(?(1)"[ \t\f\v]*)(?:,|\r|\n|\Z)'
+)
+# A line ending as csv.reader sees it: \n, \r\n or a bare \r
+_LINE_END_RE = re.compile(rb'\r\n?|\n')
+# The UTF-8 check decodes this much at a time, so files are never held as str
+_UTF8_CHUNK = 1 << 20
+
+# Error codes; validate_csv_format reports errors as (code, *args) tuples
+(E_READ_FAILED, E_EMPTY_FILE, E_MISSING_MARKERS, E_HEADER_ORDER, E_EMPTY_HEADER,
+ E_CUST_ORDER_EMPTY, E_CUST_ORDER_MISSING, E_LINES_ORDER, E_EMPTY_LINES) = range(1, 10)
+
+_ERROR_FORMATS = {
+    E_READ_FAILED: lambda reason: f"Failed to read CSV file: {reason}",
+    E_EMPTY_FILE: lambda: "CSV file is empty",
+    E_MISSING_MARKERS: lambda markers: f"Missing required markers: {', '.join(m.decode() for m in markers)}",
+    E_HEADER_ORDER: lambda: "Header end marker must come after header start marker",
+    E_EMPTY_HEADER: lambda: "Header section is empty",
+    E_CUST_ORDER_EMPTY: lambda: "CUST-ORDER field is required but empty",
+    E_CUST_ORDER_MISSING: lambda: "CUST-ORDER field is required in header section",
+    E_LINES_ORDER: lambda: "Lines end marker must come after lines start marker",
+    E_EMPTY_LINES: lambda: "Lines section is empty",
+}
+
+
+class _UncachedResult(Exception):
+    """Carries a validation result out of _validate_cached without caching it."""
+
+
+class _UnquotedDialect(csv.excel):
+    """The excel dialect with quote handling switched off."""
+    quoting = csv.QUOTE_NONE
+
+
+def _line_bounds(buf, start, pos):
+    """
+    Find the line containing pos, splitting lines where csv.reader does.
+    
+    Lines end at \n, \r\n or a bare \r. Both searches stay within the line
+    (or go back no further than start), so a scan that moves start forward
+    touches each byte a bounded number of times.
+    
+    Args:
+        buf: mmap or bytes holding the file contents
+        start: Offset of a line start at or before pos
+        pos: Offset within the line
+        
+    Returns:
+        tuple: (offset of the line, offset of the line after it)
+    """
+    line_start = max(buf.rfind(b"\n", start, pos), buf.rfind(b"\r", start, pos), start - 1) + 1
+    
+    line_end = _LINE_END_RE.search(buf, pos)
+    return line_start, len(buf) if line_end is None else line_end.end()
+
+
+def _utf8_error(buf):
+    """
+    Check that the whole file decodes as UTF-8, as the mapper reads it.
+    
+    Args:
+        buf: mmap or bytes holding the file contents
+        
+    Returns:
+        str: Description of the first decoding error, or None if there is none
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    size = len(buf)
+    for offset in range(0, size, _UTF8_CHUNK):
+        # Bytes of an incomplete character carried over from the last chunk
+        carried = len(decoder.getstate()[0])
+        try:
+            decoder.decode(buf[offset:offset + _UTF8_CHUNK], final=offset + _UTF8_CHUNK >= size)
+        except UnicodeDecodeError as e:
+            # Report positions in the file rather than in the chunk
+            start = offset - carried + e.start
+            if e.end - e.start == 1:
+                return (f"'utf-8' codec can't decode byte 0x{e.object[e.start]:02x} "
+                        f"in position {start}: {e.reason}")
+            end = offset - carried + e.end
+            return f"'utf-8' codec can't decode bytes in position {start}-{end - 1}: {e.reason}"
+    return None
+
+
+def format_error(error):
+    """
+    Format an error reported by validate_csv_format as a message.
+    
+    Args:
+        error: (code, *args) error tuple
+        
+    Returns:
+        str: Human-readable error message
+    """
+    code, *args = error
+    return _ERROR_FORMATS[code](*args)
+
+
+def validate_csv_format(csv_path, fail_fast=False):
     """
     Validate that the CSV file has the correct format.
     
+    Results for regular files are cached by (absolute path, mtime, size), so
+    validating an unchanged file again costs a single stat() call. Read
+    failures are never cached, since fixing e.g. permissions leaves the
+    mtime and size unchanged. Open file
+    descriptors are always validated afresh and are left open.
+    
+    Args:
+        csv_path: Path to the CSV file to validate, or a file descriptor
+            open for reading
+        fail_fast: Return as soon as the first error is found
+        
+    Returns:
+        tuple: (is_valid, errors), where errors are (code, *args) tuples
+        that format_error turns into messages
+    """
+    if isinstance(csv_path, int):
+        return _validate_file(csv_path, fail_fast)
+    
+    try:
+        st = os.stat(csv_path)
+    except OSError:
+        st = None
+    
+    if st is None or not stat.S_ISREG(st.st_mode):
+        # Pipes and missing files are never cached
+        return _validate_file(csv_path, fail_fast)
+    
+    try:
+        is_valid, errors = _validate_cached(os.path.abspath(csv_path), st.st_mtime_ns,
+                                            st.st_size, fail_fast)
+    except _UncachedResult as e:
+        return e.args[0]
+    return is_valid, list(errors)
+
+
+@functools.lru_cache(maxsize=256)
+def _validate_cached(abspath, mtime_ns, size, fail_fast):
+    """Cached _validate_file; mtime_ns and size only take part in the key."""
+    result = _validate_file(abspath, fail_fast)
+    is_valid, errors = result
+    if any(error[0] == E_READ_FAILED for error in errors):
+        # lru_cache does not store calls that raise
+        raise _UncachedResult(result)
+    return is_valid, tuple(errors)
+
+
+def _validate_file(csv_path, fail_fast):
+    """
+    Validate the CSV file without consulting the result cache.
+    
+    The file is memory-mapped (or read whole when it cannot be mapped, e.g. a
+    pipe) and candidate markers are located with find(). A candidate only
+    counts if, as in the mapper, column A of its line is the marker once
+    unquoted and stripped of whitespace. Marker positions are byte offsets
+    of the start of their line. Only the header section body is run
+    through csv.reader, to find the CUST-ORDER field.
+    
+    The whole file is first checked to be valid UTF-8, since the mapper
+    decodes all of it. The marker scan then stops as soon as all four
+    markers have been seen in order; a marker seen before that replaces any
+    earlier occurrence, so later duplicates win.
+    
     Args:
-        csv_path: Path to the CSV file to validate
+        csv_path: Path to the CSV file to validate, or a file descriptor
+        fail_fast: Return as soon as the first error is found
         
     Returns:
-        tuple: (is_valid, errors)
+        tuple: (is_valid, errors) as for validate_csv_format
     """
     errors = []
     
     try:
-        with open(csv_path, 'r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            rows = list(reader)
+        # A caller's file descriptor is left open for the caller to close
+        closefd = not isinstance(csv_path, int)
+        with open(csv_path, 'rb', buffering=1 << 20, closefd=closefd) as file:
+            try:
+                buf = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    # The scan runs front to back; let the kernel read ahead
+                    buf.madvise(mmap.MADV_SEQUENTIAL)
+            except (ValueError, OSError):
+                # Empty files, pipes and other unmappable inputs are read
+                # through a 1 MiB buffer instead
+                buf = file.read()
     except Exception as e:
-        return False, [f"Failed to read CSV file: {e}"]
-    
-    if not rows:
-        return False, ["CSV file is empty"]
-    
-    # Check for required markers
-    markers_found = set()
-    required_markers = {
-        "###ORD-HEADER",
-        "###ORD-HEADER-END", 
-        "###ORD-LINES",
-        "###ORD-LINES-END"
-    }
-    
-    for i, row in enumerate(rows):
-        if row and len(row) > 0:
-            marker = row[0].strip()
-            if marker in required_markers:
-                markers_found.add(marker)
-    
-    missing_markers = required_markers - markers_found
-    if missing_markers:
-        errors.append(f"Missing required markers: {', '.join(missing_markers)}")
-    
-    # Check section structure
-    header_start = None
-    header_end = None
-    lines_start = None
-    lines_end = None
-    
-    for i, row in enumerate(rows):
-        if not row:
-            continue
-        marker = row[0].strip()
+        return False, [(E_READ_FAILED, str(e))]
+    
+    if not buf:
+        return False, [(E_EMPTY_FILE,)]
+    
+    try:
+        # The mapper decodes the whole file, so every byte must be UTF-8, not
+        # just the header section that is parsed here
+        encoding_error = _utf8_error(buf)
+        if encoding_error is not None:
+            return False, [(E_READ_FAILED, encoding_error)]
+        
+        # Offset of each marker's line, and of the line after it
+        # -1 marks a slot whose marker has not been seen
+        marker_pos = array('q', [-1] * len(MARKERS))
+        body_pos = array('q', [-1] * len(MARKERS))
         
-        if marker == "###ORD-HEADER":
-            header_start = i
-        elif marker == "###ORD-HEADER-END":
-            header_end = i
-        elif marker == "###ORD-LINES":
-            lines_start = i
-        elif marker == "###ORD-LINES-END":
-            lines_end = i
+        line_end = 0
+        pos = buf.find(_MARKER_PREFIX)
+        while pos != -1:
+            line_start, line_end = _line_bounds(buf, line_end, pos)
+            
+            # Only counts when the marker makes up column A of its line
+            match = _MARKER_RE.match(buf, line_start)
+            if match:
+                slot = match.lastindex - 2
+                marker_pos[slot] = line_start
+                body_pos[slot] = line_end
+                
+                # Stop at the first complete, correctly ordered set; until
+                # then later markers replace earlier ones
+                if (marker_pos[LINES_END] > marker_pos[LINES_START] > marker_pos[HEADER_END]
+                        > marker_pos[HEADER_START] > -1):
+                    break
+            
+            pos = buf.find(_MARKER_PREFIX, line_end)
+        
+        header_start, header_end, lines_start, lines_end = marker_pos
+        # Each section body begins on the line after its start marker
+        header_body = body_pos[HEADER_START]
+        lines_body = body_pos[LINES_START]
+        
+        # Copy out the little the checks below need, so the mapping (or the
+        # whole file, when it was read from a pipe) is released before they run
+        header_bytes = None
+        if header_start != -1 and header_body < header_end:
+            header_bytes = buf[header_body:header_end]
+        # Only emptiness matters for the lines, so their body is never tokenized
+        lines_has_content = (lines_start != -1 and
+                             _CONTENT_RE.search(buf, lines_body, lines_end) is not None)
+    finally:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
+        del buf
+    
+    # Check for required markers, reported in file order
+    missing_markers = tuple(marker for marker, found in zip(MARKERS, marker_pos) if found == -1)
+    if missing_markers:
+        errors.append((E_MISSING_MARKERS, missing_markers))
+        if fail_fast:
+            return False, errors
     
     # Validate header section
-    if header_start is not None and header_end is not None:
+    if header_start != -1 and header_end != -1:
         if header_end <= header_start:
-            errors.append("Header end marker must come after header start marker")
+            errors.append((E_HEADER_ORDER,))
+        elif header_bytes is None:
+            errors.append((E_EMPTY_HEADER,))
         else:
-            header_rows = rows[header_start + 1:header_end]
-            if not header_rows:
-                errors.append("Header section is empty")
-            else:
-                # Check for CUST-ORDER field
-                has_cust_order = False
-                for row in header_rows:
-                    if len(row) >= 2 and row[0].strip() == "CUST-ORDER":
-                        has_cust_order = True
-                        if not row[1].strip():
-                            errors.append("CUST-ORDER field is required but empty")
-                        break
-                
-                if not has_cust_order:
-                    errors.append("CUST-ORDER field is required in header section")
+            # Check for CUST-ORDER field, parsing only the header section body
+            header_text = header_bytes.decode('utf-8')
+            
+            # Skip quote handling unless the body actually uses quotes
+            dialect = csv.excel if b'"' in header_bytes else _UnquotedDialect
+            
+            # Index the key/value rows by field name; the first row wins
+            header_rows = {}
+            for row in csv.reader(io.StringIO(header_text, newline=''), dialect):
+                if len(row) >= 2:
+                    header_rows.setdefault(row[0].strip(), row)
+            
+            cust_order = header_rows.get("CUST-ORDER")
+            if cust_order is None:
+                errors.append((E_CUST_ORDER_MISSING,))
+            elif not cust_order[1].strip():
+                errors.append((E_CUST_ORDER_EMPTY,))
+        
+        if fail_fast and errors:
+            return False, errors
     
     # Validate lines section
-    if lines_start is not None and lines_end is not None:
+    if lines_start != -1 and lines_end != -1:
         if lines_end <= lines_start:
-            errors.append("Lines end marker must come after lines start marker")
-        else:
-            lines_rows = rows[lines_start + 1:lines_end]
-            if not lines_rows:
-                errors.append("Lines section is empty")
+            errors.append((E_LINES_ORDER,))
+        elif not lines_has_content:
+            errors.append((E_EMPTY_LINES,))
     
     return len(errors) == 0, errors
 
 
-def main():
-    """Main validation function."""
-    if len(sys.argv) != 2:
-        print("Usage: python validate_csv.py <csv_file>")
-        sys.exit(1)
-    
-    csv_file = sys.argv[1]
-    
-    if not os.path.exists(csv_file):
-        print(f"Error: File not found: {csv_file}")
-        sys.exit(1)
+def validate_many(csv_paths, workers=None):
+    """
+    Validate many CSV files in parallel worker processes.
     
+    Args:
+        csv_paths: Paths to the CSV files to validate
+        workers: Number of worker processes (default: CPU count)
+        
+    Returns:
+        list: (path, (is_valid, errors)) pairs in the order of csv_paths,
+        one per path even when a path is repeated
+    """
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        return list(zip(csv_paths, executor.map(validate_csv_format, csv_paths)))
+
+
+def _print_result(csv_file, is_valid, errors):
+    """Print the validation report for one file."""
     print(f"Validating CSV file: {csv_file}")
     print("=" * 50)
     
-    is_valid, errors = validate_csv_format(csv_file)
-    
     if is_valid:
         print("✅ CSV file format is VALID")
         print("The file can be processed by the EDI mapper")
@@ -128,10 +347,62 @@ def main():
         print("❌ CSV file format is INVALID")
         print("\nErrors found:")
         for i, error in enumerate(errors, 1):
-            print(f"  {i}. {error}")
+            print(f"  {i}. {format_error(error)}")
     
     print("=" * 50)
 
 
+def main():
+    """Main validation function."""
+    if len(sys.argv) < 2:
+        print("Usage: python validate_csv.py <csv_file> [<csv_file> ...]")
+        sys.exit(1)
+    
+    csv_files = sys.argv[1:]
+    
+    if len(csv_files) > 1:
+        # Missing and unreadable files come back as read failures, so every
+        # file gets a report without checking the paths beforehand
+        results = validate_many(csv_files)
+        for csv_file, (is_valid, errors) in results:
+            _print_result(csv_file, is_valid, errors)
+        
+        # Exit 1 if any file is invalid, as in single-file mode
+        if not all(is_valid for _, (is_valid, _) in results):
+            sys.exit(1)
+        return
+    
+    csv_file = csv_files[0]
+    
+    # A single file is validated in-process, without the pool's startup cost.
+    # Open once and validate through the descriptor, rather than checking
+    # the path exists and then opening it again
+    try:
+        fd = os.open(csv_file, os.O_RDONLY)
+    except FileNotFoundError:
+        print(f"Error: File not found: {csv_file}")
+        sys.exit(1)
+    except OSError as e:
+        print(f"Error: Cannot open file: {csv_file} ({e.strerror})")
+        sys.exit(1)
+    
+    # Opening a directory read-only succeeds, but reading it would fail with
+    # an error naming the descriptor rather than the path
+    if stat.S_ISDIR(os.fstat(fd).st_mode):
+        os.close(fd)
+        print(f"Error: Cannot open file: {csv_file} ({os.strerror(errno.EISDIR)})")
+        sys.exit(1)
+    
+    try:
+        is_valid, errors = validate_csv_format(fd)
+    finally:
+        os.close(fd)
+    
+    _print_result(csv_file, is_valid, errors)
+    
+    if not is_valid:
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file